@@ -54,8 +54,8 @@ def convert_df_to_csv(df):
 
 supabase_client = create_supabase_client(supabase_url, supabase_key)
 
-def display_profile_card(profile):
-    # Custom CSS for styling
+def inject_profile_card_css():
+    # Custom CSS for styling, injected once per render rather than per card
     st.markdown("""
     <style>
     .profile-container {
@@ -131,6 +131,7 @@ def display_profile_card(profile):
     </style>
     """, unsafe_allow_html=True)
 
+def display_profile_card(profile):
     # Build the HTML content
     html_content = '<div class="profile-container">'
     
@@ -219,39 +220,74 @@ st.markdown("""#### Select upto 3 unicorns from the list. Dealey will find found
 
 # Multiselect option for choosing past companies.
 past_company_name = st.multiselect("Choose past companies to get started", [comp["company_name"] for comp in list_of_unicorns], default=None, help="You can pick up to three companies at once to get started.", max_selections=3, placeholder="Choose upto three companies to get started.", label_visibility="visible")
-logger.info(f"User selected {len(past_company_name)} companies for search: {past_company_name}")
 
-# Get the past company URL (example: Freshworks)
-linkedin_profile_list = []
-total_linkedin_profiles_found = 0
+# Seconds between polls of a running search job
+SEARCH_POLL_INTERVAL = 0.5
 
 # Button to trigger search
 if st.button("Search"):
-    start_time = time.time()
     logger.info("Search button pressed by user.")
+    # Logged here rather than on every rerun, since polling reruns the script while a job is running
+    logger.info(f"User selected {len(past_company_name)} companies for search: {past_company_name}")
+
+    # Drop any previous job owned by this session before starting a new one
+    if 'search_job_id' in st.session_state:
+        clear_search_job(st.session_state['search_job_id'])
+
+    if past_company_name:
+        st.session_state['search_job_id'] = submit_search_job(supabase_client, past_company_name)
+        logger.info(f"Search job {st.session_state['search_job_id']} submitted.")
+    else:
+        st.session_state.pop('search_job_id', None)
+        st.warning("Select at least one company to search.")
+
+def render_search_job_results(search_job):
+    # Render results in the order the companies were selected
+    linkedin_profile_list = []
+    for company_name in search_job['company_names']:
+        if company_name not in search_job['results']:
+            continue
+        list_of_profiles_retrieved = search_job['results'][company_name]
+        if len(list_of_profiles_retrieved):
+            linkedin_profile_list.extend(list_of_profiles_retrieved)
+            st.success(f"Profiles found for company {company_name}")
+        else:
+            st.error(f"No profiles found or an error occurred for company {company_name}.")
+
+    if search_job['status'] == 'running':
+        pending_companies = len(search_job['company_names']) - len(search_job['results'])
+        st.info(f"Searching for profiles... {pending_companies} of {len(search_job['company_names'])} companies remaining.")
+    elif search_job['status'] == 'cancelled':
+        st.warning("Search cancelled. Showing profiles found so far.")
+    st.write(f"Found {len(linkedin_profile_list)} profiles.")
+
+    inject_profile_card_css()
+    for profile in linkedin_profile_list:
+        display_profile_card(profile)
+    return linkedin_profile_list
+
+# Only this section reruns while a job is in flight; the full app reruns once it finishes
+@st.fragment(run_every=SEARCH_POLL_INTERVAL)
+def poll_search_job(job_id):
+    search_job = get_search_job(job_id)
+    if search_job is None or search_job['status'] != 'running':
+        st.rerun()
+
+    if st.button("Cancel search"):
+        if cancel_search_job(job_id):
+            logger.info(f"Search job {job_id} cancelled by user.")
+        st.rerun()
+
+    render_search_job_results(search_job)
+
+search_job = get_search_job(st.session_state['search_job_id']) if 'search_job_id' in st.session_state else None
+
+if search_job is not None and search_job['status'] == 'running':
+    poll_search_job(search_job['job_id'])
+elif search_job is not None:
+    linkedin_profile_list = render_search_job_results(search_job)
 
-    with st.spinner("Searching for profiles..."):
-        # Create a dictionary for easier lookup
-        company_url_lookup = {comp["company_name"]: comp["company_linkedin_url"] for comp in list_of_unicorns}
-        
-        for company_name in past_company_name:
-            company_url = company_url_lookup[company_name]
-            list_of_profiles_retrieved = query_stealth_founder_table(supabase_client, company_name)
-            if len(list_of_profiles_retrieved):
-                linkedin_profile_list.extend(list_of_profiles_retrieved)
-                time.sleep(0.7)
-                st.success(f"Profiles found for company {company_name}")
-            else:
-                time.sleep(0.7)
-                st.error(f"No profiles found or an error occurred for company {company_name}.")
-        logger.info(f"Search process completed in {time.time() - start_time} seconds.")
-        st.write(f"Found {len(linkedin_profile_list)} profiles.")
-        logger.info(f"Search completed. Total profiles found: {len(linkedin_profile_list)}")
     if len(linkedin_profile_list):
-        for profile in linkedin_profile_list:
-            display_profile_card(profile)
-    
-        logger.info(f"Displaying {len(linkedin_profile_list)} profiles to user.")
         # Allow users to save profiles as CSV
         df = pd.DataFrame(linkedin_profile_list)
 
@@ -265,18 +301,24 @@ if st.button("Search"):
                 file_name=f"stealth_founders_profiles.csv",
                 mime="text/csv",
             )
-    log_contents = st.session_state['log_stream'].getvalue()
-    if log_contents:
-            send_log_via_email_async(
-                    sender_email=st.secrets["sender_email"],
-                    sender_password=st.secrets["sender_password"],
-                    receiver_email=st.secrets["receiver_email"],
-                    log_content=log_contents
-                )
-            logger.info("Logs sent after scraping.")
-            st.session_state['log_stream'].truncate(0)
-            st.session_state['log_stream'].seek(0)
-    else:
-            logger.info("No logs captured to send via email.")  
+
+    # Report each finished job once, not on every rerun that redraws it
+    if st.session_state.get('search_job_reported') != search_job['job_id']:
+        st.session_state['search_job_reported'] = search_job['job_id']
+        logger.info(f"Search process finished with status {search_job['status']} in {search_job['finished_at'] - search_job['started_at']} seconds.")
+        logger.info(f"Displaying {len(linkedin_profile_list)} profiles to user.")
+        log_contents = st.session_state['log_stream'].getvalue()
+        if log_contents:
+                send_log_via_email_async(
+                        sender_email=st.secrets["sender_email"],
+                        sender_password=st.secrets["sender_password"],
+                        receiver_email=st.secrets["receiver_email"],
+                        log_content=log_contents
+                    )
+                logger.info("Logs sent after scraping.")
+                st.session_state['log_stream'].truncate(0)
+                st.session_state['log_stream'].seek(0)
+        else:
+                logger.info("No logs captured to send via email.")
 else:
     st.info("Get started by selecting up to three companies.")
@@ -10,6 +10,9 @@ import smtplib
 from email.message import EmailMessage
 import threading
 
+# Number of results requested per Proxycurl person search
+SEARCH_PAGE_SIZE = 10
+
 async def proxy_employee_search_async(proxy_api_key, current_company_profile_url, past_company_profile_url):
     headers = {'Authorization': 'Bearer ' + proxy_api_key}
     api_endpoint = 'https://nubela.co/proxycurl/api/v2/search/person'
@@ -18,7 +21,7 @@ async def proxy_employee_search_async(proxy_api_key, current_company_profile_url
         'country': 'IN',
         'current_company_linkedin_profile_url': current_company_profile_url,
         'past_company_linkedin_profile_url': past_company_profile_url,
-        'page_size': '10'
+        'page_size': str(SEARCH_PAGE_SIZE)
     }
     
     logging.info(f"Making async API request to {api_endpoint} for company {current_company_profile_url} from {past_company_profile_url}")
@@ -40,15 +43,16 @@ async def proxy_employee_search_async(proxy_api_key, current_company_profile_url
                 logging.error(f"Async API request failed with status code {response.status}")
                 return {'error': f"Request failed with status code {response.status}"}
     
-async def search_all_stealth_companies(proxy_api_key, past_company_profile_url):
-    # Create a list of async tasks for all company URLs
-    tasks = []
-    stealth_company_urls_list = [
+stealth_company_urls_list = [
     "https://www.linkedin.com/company/warmstealth/",
     "https://www.linkedin.com/company/stealthmode14/",
     "https://www.linkedin.com/company/stealth-startup-51/",
     "https://www.linkedin.com/company/stealthaistartup/"
-    ]
+]
+
+async def search_all_stealth_companies(proxy_api_key, past_company_profile_url):
+    # Create a list of async tasks for all company URLs
+    tasks = []
     for current_company_url in stealth_company_urls_list:
         tasks.append(proxy_employee_search_async(proxy_api_key, current_company_url, past_company_profile_url))
 
@@ -167,6 +171,189 @@ async def scrape_multiple_profiles(api_key, linkedin_urls, batch_size=20):
 def run_scrape_multiple_profiles_sync(api_key, linkedin_urls, batch_size=20):
     return asyncio.run(scrape_multiple_profiles(api_key, linkedin_urls, batch_size=20))
 
+from src.top_unicorn_list import list_of_unicorns
+
+# Approximate credit costs used by the query planner
+PROXYCURL_SEARCH_CREDITS_PER_RESULT = 3
+PROXYCURL_SEARCH_MIN_CREDITS = 3
+RAPIDAPI_PROFILE_CREDITS = 1
+
+def estimate_search_credits(result_count):
+    return max(PROXYCURL_SEARCH_MIN_CREDITS, result_count * PROXYCURL_SEARCH_CREDITS_PER_RESULT)
+
+def estimate_search_history(current_company_url, past_company_profile_url, search_cache, scraped_profile_urls):
+    """
+    Estimates how many results an uncached search will return, and what fraction of them will be
+    new, from cached searches for the same past company, falling back to the same stealth company.
+    """
+    for key_index, key_url in ((1, past_company_profile_url), (0, current_company_url)):
+        history = [result for key, result in search_cache.items() if key[key_index] == key_url]
+        if history:
+            expected_results = round(sum(min(result['total_results'], SEARCH_PAGE_SIZE) for result in history) / len(history))
+            seen_profiles = [url for result in history for url in result['profiles']]
+            if not seen_profiles:
+                return expected_results, 1.0
+            return expected_results, sum(url not in scraped_profile_urls for url in seen_profiles) / len(seen_profiles)
+    # No history to go on, so assume a full page of results that are all new
+    return SEARCH_PAGE_SIZE, 1.0
+
+def estimate_planned_call(company_name, current_company_url, past_company_profile_url, search_cache, scraped_profile_urls):
+    """
+    Estimates the credits to reserve for one stealth company search and the new founders it should yield.
+    Cached searches cost nothing to repeat, so only their unscraped profiles are charged. Uncached
+    searches reserve a full page of search credits, since the real result count is only known afterwards.
+    """
+    cached_result = search_cache.get((current_company_url, past_company_profile_url))
+
+    if cached_result is not None:
+        expected_results = min(cached_result['total_results'], SEARCH_PAGE_SIZE)
+        new_profiles = [url for url in cached_result['profiles'][:expected_results] if url not in scraped_profile_urls]
+        search_credits = 0
+        expected_new_founders = len(new_profiles)
+    else:
+        expected_results, new_profile_rate = estimate_search_history(current_company_url, past_company_profile_url, search_cache, scraped_profile_urls)
+        search_credits = estimate_search_credits(SEARCH_PAGE_SIZE)
+        expected_new_founders = round(expected_results * new_profile_rate)
+
+    estimated_credits = search_credits + expected_new_founders * RAPIDAPI_PROFILE_CREDITS
+    return {
+        'company_name': company_name,
+        'current_company_url': current_company_url,
+        'past_company_url': past_company_profile_url,
+        'cached': cached_result is not None,
+        'expected_results': expected_results,
+        'expected_new_founders': expected_new_founders,
+        'estimated_credits': estimated_credits,
+        'founders_per_credit': expected_new_founders / estimated_credits if estimated_credits else 0,
+    }
+
+def plan_credit_budgeted_search(credit_budget, target_company_names, search_cache=None, scraped_profile_urls=None):
+    """
+    Plans stealth company searches for the target unicorns within a credit budget.
+    Calls are ordered by expected new founders per credit and calls that would
+    overrun the budget or cannot yield new founders are skipped.
+    """
+    search_cache = search_cache if search_cache is not None else {}
+    scraped_profile_urls = scraped_profile_urls if scraped_profile_urls is not None else set()
+    company_url_lookup = {comp["company_name"]: comp["company_linkedin_url"] for comp in list_of_unicorns}
+
+    target_companies = []
+    # Repeated names would otherwise be planned, and charged against the budget, more than once
+    for company_name in dict.fromkeys(target_company_names):
+        if company_name not in company_url_lookup:
+            logging.warning(f"Skipping unknown company {company_name} while planning search.")
+            continue
+        target_companies.append(company_name)
+
+    # Build candidates round-robin across targets so equally scored calls spread the budget over every company
+    candidate_calls = []
+    for current_company_url in stealth_company_urls_list:
+        for company_name in target_companies:
+            candidate_calls.append(estimate_planned_call(company_name, current_company_url, company_url_lookup[company_name], search_cache, scraped_profile_urls))
+
+    # Best expected return per credit first; sort is stable so ties keep the round-robin order
+    candidate_calls.sort(key=lambda call: call['founders_per_credit'], reverse=True)
+
+    planned_calls = []
+    skipped_calls = []
+    remaining_credits = credit_budget
+    for call in candidate_calls:
+        if call['cached'] and call['expected_new_founders'] == 0:
+            call['skip_reason'] = 'no new founders expected'
+            skipped_calls.append(call)
+        elif call['estimated_credits'] > remaining_credits:
+            call['skip_reason'] = 'over budget'
+            skipped_calls.append(call)
+        else:
+            remaining_credits -= call['estimated_credits']
+            planned_calls.append(call)
+
+    logging.info(f"Planned {len(planned_calls)} searches for {credit_budget - remaining_credits} of {credit_budget} credits, skipped {len(skipped_calls)}.")
+    return {
+        'credit_budget': credit_budget,
+        'estimated_credits': credit_budget - remaining_credits,
+        'planned_calls': planned_calls,
+        'skipped_calls': skipped_calls,
+    }
+
+def format_search_plan_report(plan):
+    """
+    Formats a search plan as a readable dry-run report.
+    """
+    lines = [f"Credit budget: {plan['credit_budget']} | Estimated spend: {plan['estimated_credits']}"]
+    lines.append(f"Planned calls ({len(plan['planned_calls'])}):")
+    for call in plan['planned_calls']:
+        source = 'cached' if call['cached'] else 'new search'
+        lines.append(f"  {call['company_name']} -> {call['current_company_url']} | {source} | ~{call['expected_new_founders']} new founders | ~{call['estimated_credits']} credits")
+    lines.append(f"Skipped calls ({len(plan['skipped_calls'])}):")
+    for call in plan['skipped_calls']:
+        lines.append(f"  {call['company_name']} -> {call['current_company_url']} | {call['skip_reason']}")
+    return "\n".join(lines)
+
+async def execute_search_plan(proxy_api_key, rapidapi_api_key, plan, search_cache=None, scraped_profile_urls=None):
+    """
+    Runs the planned calls in order. Each call spends at most the credits the plan reserved
+    for it, so a dry run of the same plan reports exactly the calls that are made.
+    """
+    search_cache = search_cache if search_cache is not None else {}
+    scraped_profile_urls = scraped_profile_urls if scraped_profile_urls is not None else set()
+    remaining_credits = plan['credit_budget']
+    all_profiles = []
+    stopped_early = False
+
+    for call in plan['planned_calls']:
+        if remaining_credits < call['estimated_credits']:
+            logging.info(f"Credit budget exhausted before searching {call['current_company_url']} for {call['company_name']}.")
+            stopped_early = True
+            break
+
+        call_credits = call['estimated_credits']
+        cache_key = (call['current_company_url'], call['past_company_url'])
+        result = search_cache.get(cache_key)
+
+        if result is None:
+            result = await proxy_employee_search_async(proxy_api_key, call['current_company_url'], call['past_company_url'])
+            if 'error' in result:
+                remaining_credits -= PROXYCURL_SEARCH_MIN_CREDITS
+                logging.error(f"Error occurred: {result['error']}")
+                continue
+            search_credits = estimate_search_credits(len(result['profiles']))
+            remaining_credits -= search_credits
+            call_credits -= search_credits
+            search_cache[cache_key] = result
+
+        # Scrape only what is left of this call's reservation so later planned calls stay funded
+        new_profile_urls = [url for url in result['profiles'] if url not in scraped_profile_urls]
+        affordable_count = max(0, call_credits // RAPIDAPI_PROFILE_CREDITS)
+        if affordable_count < len(new_profile_urls):
+            logging.info(f"Scraping {affordable_count} of {len(new_profile_urls)} new profiles for {call['company_name']} within the planned credits.")
+            new_profile_urls = new_profile_urls[:affordable_count]
+
+        if new_profile_urls:
+            all_profiles.extend(await scrape_multiple_profiles(rapidapi_api_key, new_profile_urls))
+            remaining_credits -= len(new_profile_urls) * RAPIDAPI_PROFILE_CREDITS
+            scraped_profile_urls.update(new_profile_urls)
+
+    credits_spent = plan['credit_budget'] - remaining_credits
+    logging.info(f"Budgeted search finished. Spent {credits_spent} of {plan['credit_budget']} credits, scraped {len(all_profiles)} profiles.")
+    return {
+        'profiles': all_profiles,
+        'credits_spent': credits_spent,
+        'stopped_early': stopped_early,
+    }
+
+def dry_run_credit_budgeted_search(credit_budget, target_company_names, search_cache=None, scraped_profile_urls=None):
+    """
+    Returns a report of the calls a budgeted search would make, without spending any credits.
+    """
+    report = format_search_plan_report(plan_credit_budgeted_search(credit_budget, target_company_names, search_cache, scraped_profile_urls))
+    logging.info(f"Dry run of budgeted search:\n{report}")
+    return report
+
+def run_credit_budgeted_search_sync(proxy_api_key, rapidapi_api_key, credit_budget, target_company_names, search_cache=None, scraped_profile_urls=None):
+    plan = plan_credit_budgeted_search(credit_budget, target_company_names, search_cache, scraped_profile_urls)
+    return asyncio.run(execute_search_plan(proxy_api_key, rapidapi_api_key, plan, search_cache, scraped_profile_urls))
+
 import csv
 import os
 
@@ -283,4 +470,128 @@ def query_stealth_founder_table(supabase, past_company):
 
     except Exception as e: 
         logging.error(f"Error querying profiles for {past_company}: {str(e)}")
-        return []
\ No newline at end of file
+        return []
+
+import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared worker pool for background search jobs across all sessions
+SEARCH_JOB_MAX_WORKERS = 8
+search_job_executor = ThreadPoolExecutor(max_workers=SEARCH_JOB_MAX_WORKERS, thread_name_prefix="search-job")
+search_jobs = {}
+search_jobs_lock = threading.Lock()
+
+# Finished jobs are kept this long for sessions to redraw them, and never more than this many jobs overall
+SEARCH_JOB_TTL_SECONDS = 600
+SEARCH_JOB_MAX_RETAINED = 100
+
+def prune_search_jobs():
+    """
+    Drops finished jobs older than the TTL, then the oldest jobs while over the retention cap.
+    Jobs still running when evicted are cancelled.
+    """
+    now = time.time()
+    with search_jobs_lock:
+        expired_ids = [job_id for job_id, job in search_jobs.items() if job.get('finished_at') is not None and now - job['finished_at'] > SEARCH_JOB_TTL_SECONDS]
+        oldest_ids = sorted((job_id for job_id in search_jobs if job_id not in expired_ids), key=lambda job_id: search_jobs[job_id]['started_at'])
+        overflow_count = max(0, len(oldest_ids) - SEARCH_JOB_MAX_RETAINED)
+        evicted_jobs = [search_jobs.pop(job_id) for job_id in expired_ids + oldest_ids[:overflow_count]]
+
+    # Cancel outside the lock since cancelling runs done callbacks that take it
+    for job in evicted_jobs:
+        job['cancelled'] = True
+        for future in job['futures'].values():
+            future.cancel()
+    if evicted_jobs:
+        logging.info(f"Pruned {len(evicted_jobs)} search jobs.")
+
+def submit_search_job(supabase, company_names):
+    """
+    Submits one background query per company and returns the job ID used to poll it.
+    """
+    job_id = uuid.uuid4().hex
+    job = {
+        'company_names': list(company_names),
+        'futures': {},
+        'results': {},
+        'cancelled': False,
+        'started_at': time.time(),
+    }
+    # With nothing to query the job is complete as soon as it is created
+    if not job['company_names']:
+        job['finished_at'] = job['started_at']
+    with search_jobs_lock:
+        search_jobs[job_id] = job
+
+    for company_name in company_names:
+        future = search_job_executor.submit(query_stealth_founder_table, supabase, company_name)
+        future.add_done_callback(lambda done, job_id=job_id, company_name=company_name: record_search_job_result(job_id, company_name, done))
+        job['futures'][company_name] = future
+
+    prune_search_jobs()
+    logging.info(f"Submitted search job {job_id} for {len(company_names)} companies.")
+    return job_id
+
+def record_search_job_result(job_id, company_name, future):
+    if future.cancelled():
+        return
+    try:
+        profiles = future.result()
+    except Exception as e:
+        logging.error(f"Search job {job_id} failed for {company_name}: {str(e)}")
+        profiles = []
+
+    with search_jobs_lock:
+        job = search_jobs.get(job_id)
+        if job is None or job['cancelled']:
+            return
+        job['results'][company_name] = profiles
+        if len(job['results']) == len(job['company_names']):
+            job['finished_at'] = time.time()
+            logging.info(f"Search job {job_id} completed in {job['finished_at'] - job['started_at']} seconds.")
+
+def get_search_job(job_id):
+    """
+    Returns a snapshot of a search job's progress, or None if the job is unknown.
+    """
+    with search_jobs_lock:
+        job = search_jobs.get(job_id)
+        if job is None:
+            return None
+        if job['cancelled']:
+            status = 'cancelled'
+        elif len(job['results']) == len(job['company_names']):
+            status = 'completed'
+        else:
+            status = 'running'
+        return {
+            'job_id': job_id,
+            'status': status,
+            'company_names': list(job['company_names']),
+            'results': dict(job['results']),
+            'started_at': job['started_at'],
+            'finished_at': job.get('finished_at'),
+        }
+
+def cancel_search_job(job_id):
+    """
+    Cancels a search job. Queries that have not started are dropped from the pool;
+    queries already in flight finish but their results are discarded.
+    """
+    with search_jobs_lock:
+        job = search_jobs.get(job_id)
+        if job is None or len(job['results']) == len(job['company_names']):
+            return False
+        job['cancelled'] = True
+        job['finished_at'] = time.time()
+
+    for future in job['futures'].values():
+        future.cancel()
+    logging.info(f"Search job {job_id} cancelled.")
+    return True
+
+def clear_search_job(job_id):
+    cancel_search_job(job_id)
+    with search_jobs_lock:
+        search_jobs.pop(job_id, None)